@@ -3,12 +3,20 @@
 from __future__ import annotations
 
 import re
+import string
 from argparse import ArgumentParser
 from pathlib import Path
 from typing import Literal
 
 import emoji
 
+_TOC_BEGIN = "<!-- toc -->"
+_TOC_END = "<!-- /toc -->"
+_HEADING_RE = re.compile(r"^[^\S\n]*(#+)[^\S\n](.*)", re.MULTILINE)
+_SLUG_TABLE = str.maketrans(
+    string.ascii_uppercase + " ", string.ascii_lowercase + "-"
+)
+
 
 class Section:
     """Class to represent a section in the markdown file."""
@@ -28,6 +36,7 @@ class TableOfContents:
         """Initialize a TableOfContents object."""
         self.input_filepath = Path(input_file)
         self.sections: list[Section] = []
+        self.raw_text = ""
         self.lines: list[str] = []
         self.i_toc_begin = None
         self.i_toc_end = None
@@ -38,69 +47,74 @@ class TableOfContents:
         """Read the contents of the input file."""
         if not self.input_filepath.exists():
             raise FileNotFoundError(f"{self.input_filepath} does not exist.")
-        self.lines = self.input_filepath.read_text(
-            encoding=self.encoding
-        ).splitlines()
+        self.raw_text = self.input_filepath.read_text(encoding=self.encoding)
+        self.lines = self.raw_text.split("\n")
+
+    def _line_offset(self, i_line: int) -> int:
+        """Return the offset in the raw text where the given line starts."""
+        offset = 0
+        for _ in range(i_line):
+            offset = self.raw_text.find("\n", offset) + 1
+            if offset == 0:
+                return len(self.raw_text)
+        return offset
 
     def detect_toc_block_position(self):
         """Detect the position of the TOC block in the markdown file."""
-        b_search = re.compile(r"^\s*<!-- toc -->")
-        e_search = re.compile(r"^\s*<!-- /toc -->")
+        i_first_h2 = None
         for i_line, line in enumerate(self.lines):
-            if b_search.match(line):
+            stripped = line.lstrip()
+            if self.i_toc_begin is None and stripped.startswith(_TOC_BEGIN):
                 self.i_toc_begin = i_line
-            if e_search.match(line):
+            elif self.i_toc_end is None and stripped.startswith(_TOC_END):
                 self.i_toc_end = i_line
-        h2_search = re.compile(r"^##")
-        i_first_h2 = None
+            elif i_first_h2 is None and line.startswith("##"):
+                i_first_h2 = i_line
+            if self.i_toc_begin is not None and self.i_toc_end is not None:
+                break
         if self.i_toc_begin is None or self.i_toc_end is None:
-            for i_line, line in enumerate(self.lines):
-                if h2_search.match(line):
-                    i_first_h2 = i_line
-                    break
             if i_first_h2:
-                self.lines.insert(i_first_h2, "")
-                self.lines.insert(i_first_h2, "<!-- /toc -->")
-                self.lines.insert(i_first_h2, "<!-- toc -->")
+                # self.lines is the pre-detection view; only raw_text is
+                # read after this point.
+                offset = self._line_offset(i_first_h2)
+                self.raw_text = (
+                    self.raw_text[:offset]
+                    + f"{_TOC_BEGIN}\n{_TOC_END}\n\n"
+                    + self.raw_text[offset:]
+                )
                 self.i_toc_begin = i_first_h2
                 self.i_toc_end = i_first_h2 + 1
 
     def parse_structure(self):
         """Parse the markdown structure to identify sections."""
-        reg = re.compile(r"^\s*(#+)\s(.*)")
-        for line in self.lines:
-            if res := reg.match(line):
-                level = len(res.group(1))
-                title = res.group(2)
-                section = Section(title=title, level=level)
-                self.sections.append(section)
-        for section in self.sections:
-            if section.level == 1:
+        for res in _HEADING_RE.finditer(self.raw_text):
+            level = len(res.group(1))
+            title = res.group(2)
+            self.sections.append(Section(title=title, level=level))
+            if level == 1:
                 continue
-            link = (
-                emoji.replace_emoji(section.title, "")
-                .strip()
-                .lower()
-                .replace(" ", "-")
-            )
+            if title.isascii():
+                link = title.strip().translate(_SLUG_TABLE)
+            else:
+                link = (
+                    emoji.replace_emoji(title, "")
+                    .strip()
+                    .lower()
+                    .translate(_SLUG_TABLE)
+                )
             self.toc_lines.append(
-                f"{' ' * (2 * (section.level - 2))}"
-                + f"- [{section.title}](#{link})"
+                f"{' ' * (2 * (level - 2))}" + f"- [{title}](#{link})"
             )
 
     def output_new_line(self):
         """Output the new markdown file with the TOC."""
         if self.i_toc_begin is None:
             raise RuntimeError("TOC block position is not detected.")
-        new_lines = (
-            self.lines[0 : self.i_toc_begin + 1]
-            + [""]
-            + self.toc_lines
-            + [""]
-            + self.lines[self.i_toc_end :]
-        )
+        head = self.raw_text[: self._line_offset(self.i_toc_begin + 1)]
+        tail = self.raw_text[self._line_offset(self.i_toc_end) :]
+        toc = "\n".join(["", *self.toc_lines, "", ""])
         self.input_filepath.write_text(
-            "\n".join(new_lines), encoding=self.encoding
+            head + toc + tail, encoding=self.encoding
         )
 
 
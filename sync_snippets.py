@@ -1,15 +1,42 @@
 """Sync snippets between VS Code and Neovim."""
 
+import codecs
 import json
 import logging
+import os
 import platform
 import re
 import shutil
 from argparse import ArgumentParser
-from dataclasses import dataclass
+from collections.abc import Callable
+from collections.abc import Collection
+from concurrent.futures import ThreadPoolExecutor
 from logging import Formatter, Logger, StreamHandler
 from pathlib import Path
 from typing import TypedDict
+from typing import TypeVar
+
+_WRITE_BUFFER_SIZE = 1024 * 1024
+_VSCODE_TO_NVIM = {
+    "plaintext": "text",
+    "bat": "dosbatch",
+    "powershell": "ps1",
+    "ignore": "gitignore",
+    "shellscript": "sh,zsh",
+    "pip-requirements": "requirements",
+}
+_NVIM_TO_VSCODE = {
+    "text": "plaintext",
+    "dosbatch": "bat",
+    "ps1": "powershell",
+    "gitignore": "ignore",
+    "sh": "shellscript",
+    "zsh": "shellscript",
+    "bash": "shellscript",
+    "requirements": "pip-requirements",
+}
+_COMMENT_RE = re.compile(rb"^[ \t]*//.*\n?", re.MULTILINE)
+_SCOPE_RE = re.compile(rb'"scope":\s*"([^"]+)"')
 
 parser = ArgumentParser(description="Sync snippets between VS Code and Neovim.")
 parser.add_argument("--force-vscode", "-v", action="store_true")
@@ -41,11 +68,16 @@ class NvimSnippet(TypedDict):
     path: str
 
 
-@dataclass
-class _SnippetFile:
-    name: str
-    exists_in_vscode: bool
-    exists_in_nvim: bool
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+
+def _run_in_threads(func: Callable[[_T], _R], items: Collection[_T]) -> list[_R]:
+    """Apply func to each item in a thread pool, keeping the item order."""
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(32, len(items))) as executor:
+        return list(executor.map(func, items))
 
 
 class SnippetsSync:
@@ -54,7 +86,8 @@ class SnippetsSync:
     def __init__(self):
         """Initialize the SnippetsSync class."""
         self.vscode_dirpath, self.nvim_dirpath = self._detect_config_dirpathes()
-        self.snippets_files = self.list_snippets_files()
+        self.nvim_names = self._list_snippets_names(self.nvim_dirpath)
+        self.vscode_names = self._list_snippets_names(self.vscode_dirpath)
 
     def _detect_config_dirpathes(self) -> tuple[Path, Path]:
         """Detect the configuration directories for VS Code and Neovim."""
@@ -76,159 +109,111 @@ class SnippetsSync:
                 raise RuntimeError(f"Unsupported platform: {system}")
         return vscode_dirpath, nvim_dirpath
 
-    def list_snippets_files(self) -> list[_SnippetFile]:
-        """List all snippet files in VS Code and Neovim directories."""
-        nvim_snippets_dirpath = self.nvim_dirpath / "snippets"
-        vscode_snippets_dirpath = self.vscode_dirpath / "snippets"
-        nvim_snippets_filepaths = list(nvim_snippets_dirpath.glob("*.code-snippets"))
-        vscode_snippets_filepaths = list(
-            vscode_snippets_dirpath.glob("*.code-snippets")
-        )
-        nvim_filenames = [f.name for f in nvim_snippets_filepaths]
-        vscode_filenames = [f.name for f in vscode_snippets_filepaths]
-        snippets_filenames = set(nvim_filenames + vscode_filenames)
-        snippets_files: list[_SnippetFile] = []
-        for filename in snippets_filenames:
-            exists_in_vscode = filename in vscode_filenames
-            exists_in_nvim = filename in nvim_filenames
-            snippets_file = _SnippetFile(
-                name=filename,
-                exists_in_vscode=exists_in_vscode,
-                exists_in_nvim=exists_in_nvim,
-            )
-            snippets_files.append(snippets_file)
-        return snippets_files
+    def _scan_snippets_files(self, snippets_dirpath: Path) -> list[os.DirEntry]:
+        """Scan the snippet files in the snippets directory."""
+        try:
+            with os.scandir(snippets_dirpath) as entries:
+                return [
+                    entry for entry in entries if entry.name.endswith(".code-snippets")
+                ]
+        except FileNotFoundError:
+            return []
+
+    def _list_snippets_names(self, config_dirpath: Path) -> set[str]:
+        """List snippet file names in the configuration directory."""
+        snippets_entries = self._scan_snippets_files(config_dirpath / "snippets")
+        return {entry.name for entry in snippets_entries}
 
     def vscode_to_nvim(self, force_copy: bool = False):
         """Copy snippets files that are not in nvim"""
-        for snippets_file in self.snippets_files:
-            if force_copy or (
-                snippets_file.exists_in_vscode and not snippets_file.exists_in_nvim
-            ):
-                try:
-                    with open(
-                        self.vscode_dirpath / "snippets" / snippets_file.name,
-                        "r",
-                        encoding="utf-8",
-                    ) as fin:
-                        lines = fin.readlines()
-                except UnicodeDecodeError:
-                    with open(
-                        self.vscode_dirpath / "snippets" / snippets_file.name,
-                        "r",
-                        encoding="cp932",
-                    ) as fin:
-                        lines = fin.readlines()
-                valid_lines: list[str] = []
-                for line in lines:
-                    is_invalid = re.match(r"^\s+//[\s]+", line)
-                    if not is_invalid:
-                        match = re.search(r'"scope":\s*"([^"]+)"', line)
-                        if match:
-                            scopes_str = match.group(1)
-                            scopes = [
-                                self._convert_scope_from_vscode_to_nvim(scope.strip())
-                                for scope in scopes_str.split(",")
-                            ]
-                            line = re.sub(
-                                r'"scope":\s*"[^"]+"',
-                                f'"scope": "{",".join(scopes)}"',
-                                line,
-                            )
-                        valid_lines.append(line)
-                with open(
-                    self.nvim_dirpath / "snippets" / snippets_file.name,
-                    "w",
-                    encoding="utf-8",
-                ) as fout:
-                    fout.writelines("".join(valid_lines))
-                logger.info(f"Copied {snippets_file.name} from vscode to nvim.")
+        names = self.vscode_names if force_copy else self.vscode_names - self.nvim_names
+        _run_in_threads(self._copy_vscode_to_nvim, names)
+
+    def _copy_vscode_to_nvim(self, name: str):
+        """Copy a snippets file from vscode to nvim."""
+        with open(self.vscode_dirpath / "snippets" / name, "rb") as fin:
+            data = fin.read()
+        if not data.isascii():
+            try:
+                data.decode("utf-8")
+            except UnicodeDecodeError:
+                data = data.decode("cp932").encode("utf-8")
+        data = data.removeprefix(codecs.BOM_UTF8)
+        if b"//" in data:
+            data = _COMMENT_RE.sub(b"", data)
+        data = _SCOPE_RE.sub(self._replace_scope, data)
+        with open(
+            self.nvim_dirpath / "snippets" / name,
+            "wb",
+            buffering=_WRITE_BUFFER_SIZE,
+        ) as fout:
+            fout.write(data)
+        logger.info(f"Copied {name} from vscode to nvim.")
 
     def nvim_to_vscode(self):
         """Copy snippets files that are not in vscode"""
-        for snippets_file in self.snippets_files:
-            if snippets_file.exists_in_nvim and not snippets_file.exists_in_vscode:
-                nvim_snippets_path = self.nvim_dirpath / "snippets" / snippets_file.name
-                vscode_snippets_path = (
-                    self.vscode_dirpath / "snippets" / snippets_file.name
-                )
-                shutil.copy2(nvim_snippets_path, vscode_snippets_path)
-                logger.info(f"Copied {nvim_snippets_path.name} from nvim to vscode.")
+        _run_in_threads(self._copy_nvim_to_vscode, self.nvim_names - self.vscode_names)
+
+    def _copy_nvim_to_vscode(self, name: str):
+        """Copy a snippets file from nvim to vscode."""
+        nvim_snippets_path = self.nvim_dirpath / "snippets" / name
+        vscode_snippets_path = self.vscode_dirpath / "snippets" / name
+        shutil.copyfile(nvim_snippets_path, vscode_snippets_path)
+        logger.info(f"Copied {nvim_snippets_path.name} from nvim to vscode.")
 
     def create_package_json(self):
         """Create package.json for Neovim snippets."""
-        snippets_filepaths = (self.nvim_dirpath / "snippets").glob("*.code-snippets")
-        snippets = []
-        for snippets_filepath in snippets_filepaths:
-            scopes: list[str] = []
-            try:
-                with open(snippets_filepath, "r", encoding="utf-8") as fin:
-                    snippets_json: dict[str, SnippetDict] = json.load(fin)
-            except json.decoder.JSONDecodeError:
-                logger.error(f"{snippets_filepath.name}")
-                logger.error(f"{snippets_filepath.as_posix()}")
-                raise
-            except UnicodeDecodeError:
-                logger.error(f"{snippets_filepath.name}")
-                raise
-            for snippet in snippets_json.values():
-                snippet_scopes = snippet.get("scope", "").split(",")
-                snippet_scopes = [
-                    self._convert_scope_from_vscode_to_nvim(scope.strip())
-                    for scope in snippet_scopes
-                ]
-                scopes += snippet_scopes
-            language = ",".join(set(scopes)).replace(" ", "")
-            if language == "":
-                language = "all"
-            path = f"./{snippets_filepath.name}"
-            snippet = {"language": language, "path": path}
-            snippets.append(snippet)
+        snippets_entries = self._scan_snippets_files(self.nvim_dirpath / "snippets")
+        snippets = _run_in_threads(self._create_nvim_snippet, snippets_entries)
         dict_package = {"name": "nvim-snippets", "contributes": {"snippets": snippets}}
         with open(
-            self.nvim_dirpath / "snippets" / "package.json", "w", encoding="utf-8"
+            self.nvim_dirpath / "snippets" / "package.json",
+            "w",
+            buffering=_WRITE_BUFFER_SIZE,
+            encoding="utf-8",
         ) as fout:
             json.dump(dict_package, fout, indent=2, ensure_ascii=False)
 
+    def _create_nvim_snippet(self, snippets_entry: os.DirEntry) -> NvimSnippet:
+        """Create the package.json entry for a Neovim snippets file."""
+        scopes: set[str] = set()
+        try:
+            with open(snippets_entry.path, "r", encoding="utf-8") as fin:
+                snippets_json: dict[str, SnippetDict] = json.load(fin)
+        except json.decoder.JSONDecodeError:
+            logger.error(f"{snippets_entry.name}")
+            logger.error(f"{Path(snippets_entry.path).as_posix()}")
+            raise
+        except UnicodeDecodeError:
+            logger.error(f"{snippets_entry.name}")
+            raise
+        for snippet in snippets_json.values():
+            snippet_scopes = snippet.get("scope", "").split(",")
+            scopes.update(
+                self._convert_scope_from_vscode_to_nvim(scope.strip())
+                for scope in snippet_scopes
+            )
+        language = ",".join(scopes).replace(" ", "")
+        if language == "":
+            language = "all"
+        path = "./" + snippets_entry.name
+        return {"language": language, "path": path}
+
+    def _replace_scope(self, match: re.Match[bytes]) -> bytes:
+        """Replace a matched VS Code scope entry with Neovim scopes."""
+        scopes = [
+            self._convert_scope_from_vscode_to_nvim(scope.strip())
+            for scope in match.group(1).decode("utf-8").split(",")
+        ]
+        return f'"scope": "{",".join(scopes)}"'.encode("utf-8")
+
     def _convert_scope_from_vscode_to_nvim(self, scope: str) -> str:
         """Convert VS Code scope to Neovim scope."""
-        match scope:
-            case "plaintext":
-                return "text"
-            case "bat":
-                return "dosbatch"
-            case "powershell":
-                return "ps1"
-            case "ignore":
-                return "gitignore"
-            case "shellscript":
-                return "sh,zsh"
-            case "pip-requirements":
-                return "requirements"
-            case _:
-                return scope
+        return _VSCODE_TO_NVIM.get(scope, scope)
 
     def _convert_scope_from_nvim_to_vscode(self, scope: str) -> str:
         """Convert Neovim scope to VS Code scope."""
-        match scope:
-            case "text":
-                return "plaintext"
-            case "dosbatch":
-                return "bat"
-            case "ps1":
-                return "powershell"
-            case "gitignore":
-                return "ignore"
-            case "sh":
-                return "shellscript"
-            case "zsh":
-                return "shellscript"
-            case "bash":
-                return "shellscript"
-            case "requirements":
-                return "pip-requirements"
-            case _:
-                return scope
+        return _NVIM_TO_VSCODE.get(scope, scope)
 
 
 if __name__ == "__main__":
@@ -5,6 +5,8 @@ import os
 import sys
 from pathlib import Path
 
+_WRITE_BUFFER_SIZE = 1024 * 1024
+
 
 def create_snippet(
     file_path: str, snippet_name: str
@@ -21,12 +23,14 @@ def create_snippet(
     """
     try:
         with open(file_path, "r") as f:
-            body: list[str] = f.readlines()
+            text = f.read()
     except FileNotFoundError:
         print(f"Error: File not found at {file_path}", file=sys.stderr)
         sys.exit(1)
 
-    body = [line.rstrip("\n") for line in body]
+    body: list[str] = text.split("\n")
+    if body and body[-1] == "":
+        body.pop()
 
     snippet = {
         snippet_name: {
@@ -64,8 +68,19 @@ def main():
     snippet_data = create_snippet(input_file, snippet_name)
 
     try:
-        with open(output_filepath, "w") as f:
-            json.dump(snippet_data, f, indent=4)
+        with open(
+            output_filepath,
+            "w",
+            buffering=_WRITE_BUFFER_SIZE,
+            encoding="utf-8",
+        ) as f:
+            json.dump(
+                snippet_data,
+                f,
+                indent=4,
+                ensure_ascii=False,
+                check_circular=False,
+            )
     except IOError as e:
         print(f"Error writing to output file: {e}", file=sys.stderr)
         sys.exit(1)